@@ -7,59 +7,322 @@
 """Syntactic conversion of propositional formulas to use only specific sets of
 operators."""
 
+from functools import partial
+from sys import intern
+from typing import AbstractSet, Callable, Dict, Iterable, List, Mapping, \
+    Optional, Tuple
+
 from propositions.syntax import *
 from propositions.semantics import *
 
-def to_not_and_or(formula: Formula) -> Formula:
-    """Syntactically converts the given formula to an equivalent formula that
-    contains no constants or operators beyond ``'~'``, ``'&'``, and ``'|'``.
+#: The constants and operators, interned (as are the roots of all formulas) so
+#: that formula roots can be compared with them by identity.
+_TRUE, _FALSE, _NOT, _AND, _OR, _IMPLIES, _XOR, _IFF, _NAND, _NOR = \
+    map(intern, ('T', 'F', '~', '&', '|', '->', '+', '<->', '-&', '-|'))
+
+#: The binary operators, against which the converters test formula roots
+#: directly rather than by calling `is_binary`.
+_BINARY_OPERATORS = frozenset({_AND, _OR, _IMPLIES, _XOR, _IFF, _NAND, _NOR})
+
+#: A memo of the conversions performed so far, mapping the ``id`` of each
+#: converted formula to a pair of that formula (kept so that its ``id`` is not
+#: reused while the memo is alive) and its conversion.
+_ConversionCache = Dict[int, Tuple[Formula, Formula]]
+
+#: A hash-consing table of the formulas built so far, mapping the root of each
+#: such formula and the ``id``\ s of its operands to that formula.
+_ConsCache = Dict[Tuple[str, int, int], Formula]
+
+#: A formula constructor with the same parameters as `Formula`, which may
+#: return a previously constructed equal formula.
+_FormulaBuilder = Callable[..., Formula]
+
+#: A conversion rule, which converts an application of a constant or operator
+#: given a formula constructor and the conversions of its (zero or one or two)
+#: operands.
+_ConversionRule = Callable[[_FormulaBuilder, Optional[Formula],
+                            Optional[Formula]], Formula]
+
+#: A conversion table, mapping each constant and operator to its conversion
+#: rule.
+_ConversionTable = Mapping[str, _ConversionRule]
+
+def _cons(conses: _ConsCache, root: str, first: Optional[Formula] = None,
+          second: Optional[Formula] = None) -> Formula:
+    """Constructs a formula from its root and root operands, reusing a
+    previously constructed formula with the same root and the very same
+    operands if there is one.
 
     Parameters:
-        formula: formula to convert.
+        conses: hash-consing table of the formulas constructed so far, which
+            is updated with the constructed formula.
+        root: the root for the formula tree.
+        first: the first operand for the root, if the root is a unary or
+            binary operator.
+        second: the second operand for the root, if the root is a binary
+            operator.
 
     Returns:
-        A formula that has the same truth table as the given formula, but
-        contains no constants or operators beyond ``'~'``, ``'&'``, and
-        ``'|'``.
+        A formula with the given root and root operands.
     """
-    # Task 3.5
+    key = (root, id(first), id(second))
+    formula = conses.get(key)
+    if formula is None:
+        formula = conses[key] = Formula(root, first, second)
+    return formula
 
-    root = formula.root
+def _post_order(formula: Formula, cache: _ConversionCache,
+                skip_double_negations: bool = False) -> List[Formula]:
+    """Lowers the given formula into a flat list of its subformulas that are
+    not yet converted.
 
-    if is_variable(root):
-        return formula
+    Parameters:
+        formula: formula to lower.
+        cache: memo of the conversions already performed.
+        skip_double_negations: whether to list each double negation ``~~f``
+            after ``f`` in place of its operand ``~f``, which is then not
+            listed unless it is reachable in some other way.
 
-    if is_constant(root):
-        p = Formula('p')
-        if root == 'T':
-            return Formula('|', p, Formula('~', p))
+    Returns:
+        The subformulas of the given formula (including the formula itself)
+        whose conversions are not in the given memo, each listed once, and
+        each listed after all of its operands (except as specified above).
+    """
+    order = []
+    listed = set()
+    stack = [(formula, False)]
+    while stack:
+        node, visited = stack.pop()
+        key = id(node)
+        if key in cache or key in listed:
+            continue
+        root = node.root
+        if visited:
+            listed.add(key)
+            order.append(node)
+        elif root in _BINARY_OPERATORS:
+            stack.append((node, True))
+            stack.append((node.second, False))
+            stack.append((node.first, False))
+        elif root is _NOT:
+            stack.append((node, True))
+            operand = node.first
+            if skip_double_negations and operand.root is _NOT:
+                stack.append((operand.first, False))
+            else:
+                stack.append((operand, False))
         else:
-            return Formula('&', p, Formula('~', p))
+            listed.add(key)
+            order.append(node)
+    return order
 
-    if is_unary(root):
-        return Formula('~', to_not_and_or(formula.first))
+def _uses_only(formula: Formula, basis: AbstractSet[str]) -> bool:
+    """Checks if the given formula contains no constants or operators beyond
+    the given ones.
 
-    left = to_not_and_or(formula.first)
-    right = to_not_and_or(formula.second)
+    Parameters:
+        formula: formula to check.
+        basis: constants and operators that the formula may contain.
+
+    Returns:
+        ``True`` if the given formula contains no constants or operators
+        beyond the given ones, ``False`` otherwise.
+    """
+    seen = set()
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        key = id(node)
+        if key in seen:
+            continue
+        seen.add(key)
+        root = node.root
+        if root in _BINARY_OPERATORS:
+            if root not in basis:
+                return False
+            stack.append(node.second)
+            stack.append(node.first)
+        elif root is _NOT:
+            if root not in basis:
+                return False
+            stack.append(node.first)
+        elif (root is _TRUE or root is _FALSE) and root not in basis:
+            return False
+    return True
+
+def _convert(formula: Formula, cache: _ConversionCache, conses: _ConsCache,
+             table: _ConversionTable, basis: AbstractSet[str]) -> Formula:
+    """Converts the given formula by applying the given conversion table to
+    each of its subformulas, bottom up.
+
+    The formula is first lowered by `_post_order` into a flat list, which is
+    then converted by a single loop, so that arbitrarily deep formulas can be
+    converted without recursion. Formula roots are classified by identity
+    against the interned constants and operators, without calling
+    `is_variable`, `is_constant`, `is_unary`, or `is_binary`.
+
+    A subformula whose root is in the target basis and whose operands are
+    unchanged by the conversion is its own conversion, so formulas that are
+    already in the target basis are returned as is. Such formulas are
+    detected by a scan with `_uses_only` before any conversion is attempted.
+    Otherwise, double negations are dropped rather than converted.
+
+    Parameters:
+        formula: formula to convert.
+        cache: memo of the conversions already performed, which is updated
+            with the conversion of every subformula of the given formula.
+        conses: hash-consing table through which all formulas built by the
+            conversion are constructed.
+        table: conversion rules to apply to the constants and operators.
+        basis: constants and operators of the target basis.
 
-    if root == '&' or root == '|':
-        return Formula(root, left, right)
+    Returns:
+        The conversion of the given formula.
+    """
+    key = id(formula)
+    if key in cache:
+        return cache[key][1]
+    if _uses_only(formula, basis):
+        return formula
+    mk = partial(_cons, conses)
+    for node in _post_order(formula, cache, True):
+        root = node.root
+        if root in _BINARY_OPERATORS:
+            first = cache[id(node.first)][1]
+            second = cache[id(node.second)][1]
+            if root in basis and first is node.first and \
+               second is node.second:
+                result = node
+            else:
+                result = table[root](mk, first, second)
+        elif root is _NOT:
+            operand = node.first
+            if operand.root is _NOT:
+                # Double negations cancel out, unless they are already in the
+                # target basis.
+                inner = cache[id(operand.first)][1]
+                if root in basis and inner is operand.first:
+                    result = node
+                else:
+                    result = inner
+            else:
+                first = cache[id(operand)][1]
+                if root in basis and first is operand:
+                    result = node
+                else:
+                    result = table[root](mk, first, None)
+        elif root is _TRUE or root is _FALSE:
+            result = node if root in basis else table[root](mk, None, None)
+        else:
+            result = node
+        cache[id(node)] = (node, result)
+    return cache[id(formula)][1]
 
-    if root == '->':
-        return Formula('|', Formula('~', left), right)
+def _dedup(formula: Formula, conses: _ConsCache) -> Formula:
+    """Canonicalizes the given formula into a DAG in which equal subformulas
+    are the very same object.
 
-    if root == '+':
-        return Formula('|', Formula('&', left, Formula('~', right)), Formula('&', Formula('~', left), right))
+    Parameters:
+        formula: formula to canonicalize.
+        conses: hash-consing table of canonical formulas, which is updated
+            with the canonical subformulas of the given formula.
 
-    if root == '<->':
-        return Formula('|', Formula('&', left, right), Formula('&', Formula('~', left), Formula('~', right)))
+    Returns:
+        A formula equal to the given one, in which any two equal subformulas
+        are the same object.
+    """
+    canonical: _ConversionCache = {}
+    for node in _post_order(formula, canonical):
+        root = node.root
+        if root in _BINARY_OPERATORS:
+            first = canonical[id(node.first)][1]
+            second = canonical[id(node.second)][1]
+            unchanged = first is node.first and second is node.second
+        elif root is _NOT:
+            first = canonical[id(node.first)][1]
+            second = None
+            unchanged = first is node.first
+        else:
+            first = second = None
+            unchanged = True
+        key = (root, id(first), id(second))
+        result = conses.get(key)
+        if result is None:
+            result = conses[key] = \
+                node if unchanged else Formula(root, first, second)
+        canonical[id(node)] = (node, result)
+    return canonical[id(formula)][1]
+
+_P = Formula('p')
+_NOT_P = Formula(_NOT, _P)
+_F = Formula(_FALSE)
+
+#: Conversions of the constants by `to_not_and_or`.
+_NOT_AND_OR_T = Formula(_OR, _P, _NOT_P)
+_NOT_AND_OR_F = Formula(_AND, _P, _NOT_P)
+
+#: Constants and operators of the target basis of `to_not_and_or`.
+_NOT_AND_OR_BASIS = frozenset({_NOT, _AND, _OR})
+
+#: Conversion table of `to_not_and_or`.
+_NOT_AND_OR_TABLE: _ConversionTable = {
+    _TRUE: lambda mk, left, right: _NOT_AND_OR_T,
+    _FALSE: lambda mk, left, right: _NOT_AND_OR_F,
+    _NOT: lambda mk, left, right: mk(_NOT, left),
+    _AND: lambda mk, left, right: mk(_AND, left, right),
+    _OR: lambda mk, left, right: mk(_OR, left, right),
+    _IMPLIES: lambda mk, left, right: mk(_OR, mk(_NOT, left), right),
+    _XOR: lambda mk, left, right: mk(_OR, mk(_AND, left, mk(_NOT, right)),
+                                     mk(_AND, mk(_NOT, left), right)),
+    _IFF: lambda mk, left, right: mk(_OR, mk(_AND, left, right),
+                                     mk(_AND, mk(_NOT, left),
+                                        mk(_NOT, right))),
+    _NAND: lambda mk, left, right: mk(_NOT, mk(_AND, left, right)),
+    _NOR: lambda mk, left, right: mk(_NOT, mk(_OR, left, right))
+}
 
-    if root == '-&':
-        return Formula('~', Formula('&', left, right))
+def to_not_and_or(formula: Formula) -> Formula:
+    """Syntactically converts the given formula to an equivalent formula that
+    contains no constants or operators beyond ``'~'``, ``'&'``, and ``'|'``.
 
-    if root == '-|':
-        return Formula('~', Formula('|', left, right))
+    Parameters:
+        formula: formula to convert.
 
+    Returns:
+        A formula that has the same truth table as the given formula, but
+        contains no constants or operators beyond ``'~'``, ``'&'``, and
+        ``'|'``.
+    """
+    # Task 3.5
+    return _convert(formula, {}, {}, _NOT_AND_OR_TABLE, _NOT_AND_OR_BASIS)
+
+
+#: Conversions of the constants by `to_not_and`.
+_NOT_AND_F = _NOT_AND_OR_F
+_NOT_AND_T = Formula(_NOT, _NOT_AND_F)
+
+#: Constants and operators of the target basis of `to_not_and`.
+_NOT_AND_BASIS = frozenset({_NOT, _AND})
+
+#: Conversion table of `to_not_and`.
+_NOT_AND_TABLE: _ConversionTable = {
+    _TRUE: lambda mk, left, right: _NOT_AND_T,
+    _FALSE: lambda mk, left, right: _NOT_AND_F,
+    _NOT: lambda mk, left, right: mk(_NOT, left),
+    _AND: lambda mk, left, right: mk(_AND, left, right),
+    _OR: lambda mk, left, right: mk(_NOT, mk(_AND, mk(_NOT, left),
+                                            mk(_NOT, right))),
+    _IMPLIES: lambda mk, left, right: mk(_NOT,
+                                         mk(_AND, left, mk(_NOT, right))),
+    _XOR: lambda mk, left, right: mk(_NOT, mk(
+        _AND, mk(_NOT, mk(_AND, left, mk(_NOT, right))),
+        mk(_NOT, mk(_AND, mk(_NOT, left), right)))),
+    _IFF: lambda mk, left, right: mk(_NOT, mk(
+        _AND, mk(_NOT, mk(_AND, left, right)),
+        mk(_NOT, mk(_AND, mk(_NOT, left), mk(_NOT, right))))),
+    _NAND: lambda mk, left, right: mk(_NOT, mk(_AND, left, right)),
+    _NOR: lambda mk, left, right: mk(_AND, mk(_NOT, left), mk(_NOT, right))
+}
 
 def to_not_and(formula: Formula) -> Formula:
     """Syntactically converts the given formula to an equivalent formula that
@@ -73,47 +336,58 @@ def to_not_and(formula: Formula) -> Formula:
         contains no constants or operators beyond ``'~'`` and ``'&'``.
     """
     # Task 3.6a
+    return _convert(formula, {}, {}, _NOT_AND_TABLE, _NOT_AND_BASIS)
 
-    root = formula.root
-
-    if is_variable(root):
-        return formula
-
-    if is_constant(root):
-        p = Formula('p')
-        if root == 'T':
-            return Formula('~', Formula('&', p, Formula('~', p)))
-        return Formula('&', p, Formula('~', p))
-
-    if is_unary(root):
-        return Formula('~', to_not_and(formula.first))
-
-    left = to_not_and(formula.first)
-    right = to_not_and(formula.second)
-
-    if root == '&':
-        return Formula('&', left, right)
-
-    if root == '|':
-        return Formula('~', Formula('&', Formula('~', left), Formula('~', right)))
 
-    if root == '->':
-        return to_not_and(Formula('|', Formula('~', formula.first), formula.second))
+def _nand_xor(mk: _FormulaBuilder, left: Formula, right: Formula) -> Formula:
+    """Builds the exclusive or of the given formulas using only ``'-&'``.
 
-    if root == '+':
-        return to_not_and(Formula('|', Formula('&', formula.first, Formula('~', formula.second)), Formula('&', Formula('~', formula.first), formula.second)))
+    Parameters:
+        mk: formula constructor to use.
+        left: first operand, which contains no operators beyond ``'-&'``.
+        right: second operand, which contains no operators beyond ``'-&'``.
 
-    if root == '<->':
-        return to_not_and(
-            Formula('|', Formula('&', formula.first, formula.second), Formula('&', Formula('~', formula.first), Formula('~', formula.second))))
+    Returns:
+        A formula over ``'-&'`` that is equivalent to ``(left+right)``.
+    """
+    nand = mk(_NAND, left, right)
+    return mk(_NAND, mk(_NAND, left, nand), mk(_NAND, right, nand))
 
-    if root == '-&':
-        return Formula('~', Formula('&', left, right))
+def _nand_not(mk: _FormulaBuilder, formula: Formula) -> Formula:
+    """Builds the negation of the given formula using only ``'-&'``.
 
-    if root == '-|':
-        return to_not_and(Formula('~', Formula('|', formula.first, formula.second)))
-    return formula
+    Parameters:
+        mk: formula constructor to use.
+        formula: formula to negate, which contains no operators beyond
+            ``'-&'``.
 
+    Returns:
+        A formula over ``'-&'`` that is equivalent to ``~formula``.
+    """
+    return mk(_NAND, formula, formula)
+
+#: Conversions of the constants by `to_nand`.
+_NAND_T = Formula(_NAND, _P, Formula(_NAND, _P, _P))
+_NAND_F = Formula(_NAND, _NAND_T, _NAND_T)
+
+#: Constants and operators of the target basis of `to_nand`.
+_NAND_BASIS = frozenset({_NAND})
+
+#: Conversion table of `to_nand`.
+_NAND_TABLE: _ConversionTable = {
+    _TRUE: lambda mk, left, right: _NAND_T,
+    _FALSE: lambda mk, left, right: _NAND_F,
+    _NOT: lambda mk, left, right: _nand_not(mk, left),
+    _AND: lambda mk, left, right: _nand_not(mk, mk(_NAND, left, right)),
+    _OR: lambda mk, left, right: mk(_NAND, _nand_not(mk, left),
+                                    _nand_not(mk, right)),
+    _IMPLIES: lambda mk, left, right: mk(_NAND, left, _nand_not(mk, right)),
+    _XOR: lambda mk, left, right: _nand_xor(mk, left, right),
+    _IFF: lambda mk, left, right: _nand_not(mk, _nand_xor(mk, left, right)),
+    _NAND: lambda mk, left, right: mk(_NAND, left, right),
+    _NOR: lambda mk, left, right: _nand_not(
+        mk, mk(_NAND, _nand_not(mk, left), _nand_not(mk, right)))
+}
 
 def to_nand(formula: Formula) -> Formula:
     """Syntactically converts the given formula to an equivalent formula that
@@ -127,63 +401,37 @@ def to_nand(formula: Formula) -> Formula:
         contains no constants or operators beyond ``'-&'``.
     """
     # Task 3.6b
-
-    root = formula.root
-
-    if is_variable(root):
-        return formula
-
-    if is_constant(root):
-        p = Formula('p')
-        not_p = Formula('-&', p, p)
-        t = Formula('-&', p, not_p)
-        if root == 'T':
-            return t
-        return Formula('-&', t, t)
-
-    if is_unary(root):
-        inner = to_nand(formula.first)
-        return Formula('-&', inner, inner)
-
-    left = to_nand(formula.first)
-    right = to_nand(formula.second)
-
-    if root == '&':
-        nand = Formula('-&', left, right)
-        return Formula('-&', nand, nand)
-
-    if root == '|':
-        left_not = Formula('-&', left, left)
-        right_not = Formula('-&', right, right)
-        return Formula('-&', left_not, right_not)
-
-    if root == '->':
-        right_not = Formula('-&', right, right)
-        return Formula('-&', left, right_not)
-
-    if root == '+':
-        left_not = Formula('-&', left, left)
-        right_not = Formula('-&', right, right)
-        a_or_b = Formula('-&', left_not, right_not)
-        a_and_b = Formula('-&', Formula('-&', left, right), Formula('-&', left, right))
-        not_and = Formula('-&', a_and_b, a_and_b)
-        return Formula('-&', Formula('-&', a_or_b, not_and), Formula('-&', a_or_b, not_and))
-
-    if root == '<->':
-        xor = to_nand(Formula('+', formula.first, formula.second))
-        return Formula('-&', xor, xor)
-
-    if root == '-&':
-        return Formula('-&', left, right)
-
-    if root == '-|':
-        left_not = Formula('-&', left, left)
-        right_not = Formula('-&', right, right)
-        a_or_b = Formula('-&', left_not, right_not)
-        return Formula('-&', a_or_b, a_or_b)
-
-    return formula
-
+    # The expansions of '-&' share many subformulas, so the result is
+    # canonicalized into a DAG, unless the formula was already in the basis.
+    conses: _ConsCache = {}
+    converted = _convert(formula, {}, conses, _NAND_TABLE, _NAND_BASIS)
+    return converted if converted is formula else _dedup(converted, conses)
+
+
+#: Conversions of the constants by `to_implies_not`.
+_IMPLIES_NOT_T = Formula(_IMPLIES, _P, _P)
+_IMPLIES_NOT_F = Formula(_NOT, _IMPLIES_NOT_T)
+
+#: Constants and operators of the target basis of `to_implies_not`.
+_IMPLIES_NOT_BASIS = frozenset({_IMPLIES, _NOT})
+
+#: Conversion table of `to_implies_not`.
+_IMPLIES_NOT_TABLE: _ConversionTable = {
+    _TRUE: lambda mk, left, right: _IMPLIES_NOT_T,
+    _FALSE: lambda mk, left, right: _IMPLIES_NOT_F,
+    _NOT: lambda mk, left, right: mk(_NOT, left),
+    _IMPLIES: lambda mk, left, right: mk(_IMPLIES, left, right),
+    _AND: lambda mk, left, right: mk(_NOT,
+                                     mk(_IMPLIES, left, mk(_NOT, right))),
+    _OR: lambda mk, left, right: mk(_IMPLIES, mk(_NOT, left), right),
+    _XOR: lambda mk, left, right: mk(_IMPLIES, mk(_IMPLIES, left, right),
+                                     mk(_NOT, mk(_IMPLIES, right, left))),
+    _IFF: lambda mk, left, right: mk(_NOT, mk(
+        _IMPLIES, mk(_IMPLIES, left, right),
+        mk(_NOT, mk(_IMPLIES, right, left)))),
+    _NAND: lambda mk, left, right: mk(_IMPLIES, left, mk(_NOT, right)),
+    _NOR: lambda mk, left, right: mk(_NOT, mk(_IMPLIES, mk(_NOT, left), right))
+}
 
 def to_implies_not(formula: Formula) -> Formula:
     """Syntactically converts the given formula to an equivalent formula that
@@ -197,48 +445,51 @@ def to_implies_not(formula: Formula) -> Formula:
         contains no constants or operators beyond ``'->'`` and ``'~'``.
     """
     # Task 3.6c
+    return _convert(formula, {}, {}, _IMPLIES_NOT_TABLE, _IMPLIES_NOT_BASIS)
 
-    root = formula.root
 
-    if is_variable(root):
-        return formula
-
-    if is_constant(root):
-        p = Formula('p')
-        if root == 'T':
-            return Formula('->', p, p)
-        return Formula('~', Formula('->', p, p))
-
-    if is_unary(root):
-        return Formula('~', to_implies_not(formula.first))
-
-    left = to_implies_not(formula.first)
-    right = to_implies_not(formula.second)
-
-    if root == '->':
-        return Formula('->', left, right)
-
-    if root == '&':
-        return Formula('~', Formula('->', left, Formula('~', right)))
-
-    if root == '|':
-        return Formula('->', Formula('~', left), right)
+def _implies_false_not(mk: _FormulaBuilder, formula: Formula) -> Formula:
+    """Builds the negation of the given formula using only ``'->'`` and
+    ``'F'``.
 
-    if root == '+':
-        return to_implies_not(
-            Formula('|', Formula('&', formula.first, Formula('~', formula.second)), Formula('&', Formula('~', formula.first), formula.second)))
-
-    if root == '<->':
-        return to_implies_not(Formula('|', Formula('&', formula.first, formula.second), Formula('&', Formula('~', formula.first), Formula('~', formula.second))))
-
-    if root == '-&':
-        return to_implies_not(Formula('~', Formula('&', formula.first, formula.second)))
-
-    if root == '-|':
-        return to_implies_not(Formula('~', Formula('|', formula.first, formula.second)))
-
-    return formula
+    Parameters:
+        mk: formula constructor to use.
+        formula: formula to negate, which contains no constants or operators
+            beyond ``'->'`` and ``'F'``.
 
+    Returns:
+        A formula over ``'->'`` and ``'F'`` that is equivalent to ``~formula``.
+    """
+    return mk(_IMPLIES, formula, _F)
+
+#: Conversions of the constants by `to_implies_false`.
+_IMPLIES_FALSE_T = Formula(_IMPLIES, _F, _F)
+_IMPLIES_FALSE_F = _F
+
+#: Constants and operators of the target basis of `to_implies_false`.
+_IMPLIES_FALSE_BASIS = frozenset({_IMPLIES, _FALSE})
+
+#: Conversion table of `to_implies_false`.
+_IMPLIES_FALSE_TABLE: _ConversionTable = {
+    _TRUE: lambda mk, left, right: _IMPLIES_FALSE_T,
+    _FALSE: lambda mk, left, right: _IMPLIES_FALSE_F,
+    _NOT: lambda mk, left, right: _implies_false_not(mk, left),
+    _IMPLIES: lambda mk, left, right: mk(_IMPLIES, left, right),
+    _AND: lambda mk, left, right: _implies_false_not(
+        mk, mk(_IMPLIES, left, _implies_false_not(mk, right))),
+    _OR: lambda mk, left, right: mk(_IMPLIES, _implies_false_not(mk, left),
+                                    right),
+    _XOR: lambda mk, left, right: mk(
+        _IMPLIES, mk(_IMPLIES, left, right),
+        _implies_false_not(mk, mk(_IMPLIES, right, left))),
+    _IFF: lambda mk, left, right: _implies_false_not(mk, mk(
+        _IMPLIES, mk(_IMPLIES, left, right),
+        _implies_false_not(mk, mk(_IMPLIES, right, left)))),
+    _NAND: lambda mk, left, right: mk(_IMPLIES, left,
+                                      _implies_false_not(mk, right)),
+    _NOR: lambda mk, left, right: _implies_false_not(
+        mk, mk(_IMPLIES, _implies_false_not(mk, left), right))
+}
 
 def to_implies_false(formula: Formula) -> Formula:
     """Syntactically converts the given formula to an equivalent formula that
@@ -252,45 +503,100 @@ def to_implies_false(formula: Formula) -> Formula:
         contains no constants or operators beyond ``'->'`` and ``'F'``.
     """
     # Task 3.6d
+    # The expansions of '->' and 'F' share many subformulas, so the result is
+    # canonicalized into a DAG, unless the formula was already in the basis.
+    conses: _ConsCache = {}
+    converted = _convert(formula, {}, conses, _IMPLIES_FALSE_TABLE,
+                         _IMPLIES_FALSE_BASIS)
+    return converted if converted is formula else _dedup(converted, conses)
 
-    root = formula.root
 
-    if is_variable(root):
-        return formula
+def _convert_many(formulas: Iterable[Formula], table: _ConversionTable,
+                  basis: AbstractSet[str], dag: bool) -> List[Formula]:
+    """Converts each of the given formulas by applying the given conversion
+    table, sharing the conversion of common subformulas among all of them.
 
-    if is_constant(root):
-        if root == 'F':
-            return Formula('F')
-        return Formula('->', Formula('F'), Formula('F'))
+    Parameters:
+        formulas: formulas to convert.
+        table: conversion rules to apply to the constants and operators.
+        basis: constants and operators of the target basis.
+        dag: whether to canonicalize the conversions into a DAG, as is done
+            by `to_nand` and `to_implies_false`.
 
-    if is_unary(root):
-        inner = to_implies_false(formula.first)
-        return Formula('->', inner, Formula('F'))
+    Returns:
+        A list of the conversions of the given formulas, in the same order.
+    """
+    # The memo pins every formula it converts, so the given formulas may be
+    # generated one at a time without their ``id``\ s being reused.
+    cache: _ConversionCache = {}
+    conses: _ConsCache = {}
+    converted = []
+    for formula in formulas:
+        conversion = _convert(formula, cache, conses, table, basis)
+        if dag and conversion is not formula:
+            conversion = _dedup(conversion, conses)
+        converted.append(conversion)
+    return converted
+
+def to_not_and_or_many(formulas: Iterable[Formula]) -> List[Formula]:
+    """Syntactically converts each of the given formulas as `to_not_and_or`
+    does, converting each subformula shared among them only once.
 
-    left = to_implies_false(formula.first)
-    right = to_implies_false(formula.second)
+    Parameters:
+        formulas: formulas to convert.
 
-    if root == '->':
-        return Formula('->', left, right)
+    Returns:
+        A list of the conversions of the given formulas, in the same order.
+    """
+    return _convert_many(formulas, _NOT_AND_OR_TABLE, _NOT_AND_OR_BASIS, False)
 
-    if root == '&':
-        return Formula('->', Formula('->', left, Formula('->', right, Formula('F'))), Formula('F'))
+def to_not_and_many(formulas: Iterable[Formula]) -> List[Formula]:
+    """Syntactically converts each of the given formulas as `to_not_and`
+    does, converting each subformula shared among them only once.
 
-    if root == '|':
-        return Formula('->', Formula('->', left, Formula('F')), right)
+    Parameters:
+        formulas: formulas to convert.
 
-    if root == '+':
-        return to_implies_false(Formula('|', Formula('&', formula.first, Formula('~', formula.second)),
-                                        Formula('&', Formula('~', formula.first), formula.second)))
+    Returns:
+        A list of the conversions of the given formulas, in the same order.
+    """
+    return _convert_many(formulas, _NOT_AND_TABLE, _NOT_AND_BASIS, False)
 
-    if root == '<->':
-        return to_implies_false(Formula('|', Formula('&', formula.first, formula.second),
-                                        Formula('&', Formula('~', formula.first), Formula('~', formula.second))))
+def to_nand_many(formulas: Iterable[Formula]) -> List[Formula]:
+    """Syntactically converts each of the given formulas as `to_nand` does,
+    converting each subformula shared among them only once.
 
-    if root == '-&':
-        return to_implies_false(Formula('~', Formula('&', formula.first, formula.second)))
+    Parameters:
+        formulas: formulas to convert.
 
-    if root == '-|':
-        return to_implies_false(Formula('~', Formula('|', formula.first, formula.second)))
+    Returns:
+        A list of the conversions of the given formulas, in the same order.
+    """
+    return _convert_many(formulas, _NAND_TABLE, _NAND_BASIS, True)
 
-    return formula
+def to_implies_not_many(formulas: Iterable[Formula]) -> List[Formula]:
+    """Syntactically converts each of the given formulas as `to_implies_not`
+    does, converting each subformula shared among them only once.
+
+    Parameters:
+        formulas: formulas to convert.
+
+    Returns:
+        A list of the conversions of the given formulas, in the same order.
+    """
+    return _convert_many(formulas, _IMPLIES_NOT_TABLE, _IMPLIES_NOT_BASIS,
+                         False)
+
+def to_implies_false_many(formulas: Iterable[Formula]) -> List[Formula]:
+    """Syntactically converts each of the given formulas as
+    `to_implies_false` does, converting each subformula shared among them
+    only once.
+
+    Parameters:
+        formulas: formulas to convert.
+
+    Returns:
+        A list of the conversions of the given formulas, in the same order.
+    """
+    return _convert_many(formulas, _IMPLIES_FALSE_TABLE, _IMPLIES_FALSE_BASIS,
+                         True)
@@ -6,6 +6,8 @@
 
 """Tests for the propositions.operators module."""
 
+from sys import getrecursionlimit
+
 from propositions.syntax import *
 from propositions.semantics import *
 from propositions.operators import *
@@ -85,6 +87,151 @@ def test_to_implies_false(debug=False):
                str(ff) + ' contains wrong operators'
         assert is_tautology(Formula('<->', f, ff))
 
+def test_deep_formulas(debug=False):
+    if debug:
+        print()
+    # A formula twice as deep as the recursion limit.
+    depth = getrecursionlimit()
+    f = Formula('p')
+    for i in range(depth):
+        f = Formula('~', Formula('+', f, Formula('q')))
+    for convert, basis in [(to_not_and_or, {'~', '&', '|'}),
+                           (to_not_and, {'~', '&'}), (to_nand, {'-&'}),
+                           (to_implies_not, {'->', '~'}),
+                           (to_implies_false, {'->', 'F'})]:
+        if debug:
+            print('Testing conversion of a formula of depth', 2 * depth + 1,
+                  'to a formula using only', basis)
+        ff = convert(f)
+        # The operators of the result are collected without recursion.
+        operators = set()
+        seen = set()
+        stack = [ff]
+        while stack:
+            g = stack.pop()
+            if id(g) in seen:
+                continue
+            seen.add(id(g))
+            if not is_variable(g.root):
+                operators.add(g.root)
+            if hasattr(g, 'first'):
+                stack.append(g.first)
+            if hasattr(g, 'second'):
+                stack.append(g.second)
+        assert operators.issubset(basis), \
+               str(operators) + ' contains wrong operators'
+
+def test_in_basis_subformulas(debug=False):
+    if debug:
+        print()
+    # The first operand of each formula is already in the target basis.
+    for convert, f in [(to_not_and_or, '((p&~q)->r)'),
+                       (to_not_and, '((p&~q)|r)'), (to_nand, '((p-&q)|r)'),
+                       (to_implies_not, '((p->~q)&r)'),
+                       (to_implies_false, '((p->F)&r)')]:
+        if debug:
+            print('Testing that', convert.__name__, 'reuses the first operand',
+                  'of', f)
+        f = Formula.parse(f)
+        ff = convert(f)
+        assert is_tautology(Formula('<->', f, ff))
+        reused = False
+        stack = [ff]
+        while stack and not reused:
+            g = stack.pop()
+            reused = g is f.first
+            if hasattr(g, 'first'):
+                stack.append(g.first)
+            if hasattr(g, 'second'):
+                stack.append(g.second)
+        assert reused, str(ff) + ' does not reuse the original ' + str(f.first)
+
+def test_shared_subformulas(debug=False):
+    if debug:
+        print()
+    for convert in [to_nand, to_implies_false]:
+        f = Formula.parse('((x+y)<->(x+y))')
+        if debug:
+            print('Testing that', convert.__name__, 'shares equal subformulas',
+                  'in the conversion of', f)
+        ff = convert(f)
+        assert is_tautology(Formula('<->', f, ff))
+        subformulas = {}
+        stack = [ff]
+        while stack:
+            g = stack.pop()
+            assert subformulas.setdefault(str(g), g) is g, \
+                   str(g) + ' appears as more than one object'
+            if hasattr(g, 'first'):
+                stack.append(g.first)
+            if hasattr(g, 'second'):
+                stack.append(g.second)
+
+def test_double_negations(debug=False):
+    if debug:
+        print('Testing that double negations cancel out unless they are',
+              'already in the target basis.')
+    f = Formula.parse('~~~~p')
+    assert to_nand(f) is f.first.first.first.first
+    assert to_implies_false(f) is f.first.first.first.first
+    f = Formula.parse('~~~p')
+    ff = to_nand(f)
+    assert ff.root == '-&' and ff.first is ff.second is f.first.first.first, \
+           str(ff) + ' is not a single negation of p'
+    ff = to_implies_false(f)
+    assert ff.root == '->' and ff.first is f.first.first.first and \
+           ff.second.root == 'F', str(ff) + ' is not a single negation of p'
+    f = Formula.parse('~~p')
+    assert to_not_and(f) is f
+    assert to_implies_not(f) is f
+
+def test_to_many(debug=False):
+    if debug:
+        print()
+    fs = [Formula.parse(f) for f in many_fs]
+    # Also include formulas that share subformula objects with the others.
+    fs.extend([Formula('&', fs[-1], fs[-2]), Formula('~', fs[-1])])
+    for convert_many, basis in [(to_not_and_or_many, {'~', '&', '|'}),
+                                (to_not_and_many, {'~', '&'}),
+                                (to_nand_many, {'-&'}),
+                                (to_implies_not_many, {'->', '~'}),
+                                (to_implies_false_many, {'->', 'F'})]:
+        if debug:
+            print('Testing conversion of all formulas at once to formulas',
+                  'using only', basis)
+        ffs = convert_many(fs)
+        assert len(ffs) == len(fs)
+        for f, ff in zip(fs, ffs):
+            assert ff.operators().issubset(basis), \
+                   str(ff) + ' contains wrong operators'
+            assert is_tautology(Formula('<->', f, ff))
+        if debug:
+            print('Testing conversion of formulas parsed one at a time to',
+                  'formulas using only', basis)
+        # Each formula may be freed once converted, so the memo must not
+        # confuse it with a later formula that reuses its id.
+        ffs = convert_many(Formula.parse(f) for f in many_fs * 10)
+        assert len(ffs) == 10 * len(many_fs)
+        for f, ff in zip(many_fs * 10, ffs):
+            assert ff.operators().issubset(basis), \
+                   str(ff) + ' contains wrong operators'
+            assert is_tautology(Formula('<->', Formula.parse(f), ff))
+
+def test_in_basis_formulas(debug=False):
+    if debug:
+        print()
+    for convert, fs in [
+            (to_not_and_or, ['p', '~(p&~q)', '((p|q)&~~r)']),
+            (to_not_and, ['p', '~(p&~q)', '~~(p&q)']),
+            (to_nand, ['p', '(p-&q)', '((p-&q)-&(p-&q))']),
+            (to_implies_not, ['p', '(p->~q)', '~(~p->(q->r))']),
+            (to_implies_false, ['p', 'F', '(p->F)', '((p->F)->(F->q))'])]:
+        for f in fs:
+            if debug:
+                print('Testing that', convert.__name__, 'returns', f, 'as is')
+            f = Formula.parse(f)
+            assert convert(f) is f
+
 def test_ex3(debug=False):
     assert is_binary('+'), 'Change is_binary() before testing Chapter 3 tasks.'
     test_operators_defined(debug)
@@ -93,6 +240,12 @@ def test_ex3(debug=False):
     test_to_nand(debug)
     test_to_implies_not(debug)
     test_to_implies_false(debug)
+    test_deep_formulas(debug)
+    test_in_basis_subformulas(debug)
+    test_shared_subformulas(debug)
+    test_double_negations(debug)
+    test_to_many(debug)
+    test_in_basis_formulas(debug)
 
 def test_all(debug=False):
     test_ex3(debug)
@@ -8,6 +8,7 @@
 
 from __future__ import annotations
 from functools import lru_cache
+from sys import intern
 from typing import Mapping, Optional, Set, Tuple, Union
 
 from logic_utils import frozen, memoized_parameterless_method
@@ -91,6 +92,8 @@ class Formula:
             second: the second operand for the root, if the root is a binary
                 operator.
         """
+        # Roots are interned so that they can be compared by identity.
+        root = intern(root)
         if is_variable(root) or is_constant(root):
             assert first is None and second is None
             self.root = root